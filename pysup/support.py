@@ -1,20 +1,344 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import asyncio
+import re
+import sys
+from asyncio import (
+    AbstractEventLoop,
+    Semaphore,
+    Task,
+    gather,
+    get_running_loop,
+    new_event_loop,
+    run_coroutine_threadsafe,
+    shield,
+    sleep,
+)
 from asyncio import run as asyncio_run
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from functools import lru_cache
+from importlib.util import find_spec
+from json import dumps as json_dumps
+from json import loads as json_loads
+from random import random
+from threading import Lock, RLock, Thread
+from time import monotonic, time
+from typing import Any, Self, TypeVar
+from weakref import WeakKeyDictionary
 
-from decouple import config
-from httpx import AsyncClient
+from decouple import UndefinedValueError, config
+from httpx import URL, AsyncClient, Headers, Limits, Response, TransportError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+T = TypeVar("T")
+
+# JSON bodies are encoded/decoded with orjson when installed, otherwise with the stdlib json module
+if orjson is not None:
+
+    def _dumps(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+else:
+
+    def _dumps(data: Any) -> bytes:
+        return json_dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    _loads = json_loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Concurrent requests share one multiplexed connection when httpx's HTTP/2 support (h2) is installed
+_HTTP2 = find_spec("h2") is not None
+
+# Read once at import, so constructing a Ticket per request does not re-read the environment/.env file
+_DEFAULT_BASE_URL: str | None = config("SUPPORT_BASE_URL", default=None)
+_DEFAULT_TOKEN: str | None = config("SUPPORT_SECRET_TOKEN", default=None)
+_DEFAULT_AUTH_HEADER: str | None = f"Bearer {_DEFAULT_TOKEN}" if _DEFAULT_TOKEN is not None else None
+
+_ETAG_MAXSIZE = 1024
+
+# Transient failures are retried with full-jitter exponential backoff on the same pooled client.
+# POST is only retried when the caller supplies an Idempotency-Key.
+_IDEMPOTENT_VERBS = frozenset({"GET", "PUT", "DELETE"})
+_RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+_RETRY_BASE = 0.5
+_RETRY_CAP = 8.0
+
+# Seconds a cached GET response stays fresh, a stale entry is still served for one more TTL while it refreshes
+DEFAULT_CACHE_TTL = {
+    "department_list": 3600.0,
+    "ticket_list": 30.0,
+    "log_list": 30.0,
+    "entity": 300.0,
+}
+
+# The background loop runs on uvloop when uvloop is installed
+_loop_factory: Callable[[], AbstractEventLoop] = uvloop.new_event_loop if uvloop is not None else new_event_loop
+
+_LOOP: AbstractEventLoop | None = None
+_LOOP_LOCK = Lock()
+
+
+def _background_loop() -> AbstractEventLoop:
+    # One long-lived loop in a daemon thread serves every *_sync call, so the
+    # shared client's connection pool survives between sync invocations.
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = _loop_factory()
+                Thread(target=loop.run_forever, name="pysup-loop", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+def _retry_after(response: Response) -> float | None:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _cache_key(url: str, data: dict | None) -> str:
+    return f"{url}?{sorted((data or {}).items())!r}"
+
+
+# Paths are relative to the client's base_url; hot ids reuse the formatted string
+@lru_cache(maxsize=1024)
+def _department_path(department_id: int | str) -> str:
+    return f"/department/{department_id}"
+
+
+@lru_cache(maxsize=1024)
+def _ticket_path(ticket_id: int | str) -> str:
+    return f"/ticket/{ticket_id}"
+
+
+@lru_cache(maxsize=1024)
+def _ticket_replies_path(ticket_id: int | str) -> str:
+    return f"/ticket/{ticket_id}/replies"
+
+
+@lru_cache(maxsize=1024)
+def _reply_path(reply_id: int | str) -> str:
+    return f"/ticket-replies/{reply_id}"
+
+
+# Cache tags of the list reads affected by a write to each collection
+_COLLECTION_TAGS = {
+    "ticket-replies": ("ticket", "replies"),
+}
+
+
+class _TTLCache:
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        # key -> (expiry, ttl, encoded value, tags); values are kept as JSON bytes so every hit decodes
+        # its own copy, and the tags are kept so eviction can unlink the key from them
+        self._entries: dict[str, tuple[float, float, bytes, tuple[str, ...]]] = {}
+        self._tags: dict[str, set[str]] = {}
+        self._inflight: dict[str, Task] = {}
+        self._generation = 0
+        # Ticket is used from the background loop thread and from callers' loops at the same time
+        self._lock = RLock()
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        ttl: float,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[dict | None]],
+    ) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expiry, entry_ttl, value, _ = entry
+                now = monotonic()
+                if now < expiry:
+                    return _loads(value)
+                if now < expiry + entry_ttl:
+                    # Stale-while-revalidate: serve the old value and refresh it in the background
+                    self._fetch(key, ttl, tags, loader)
+                    return _loads(value)
+                self._remove(key)
+
+            task = self._fetch(key, ttl, tags, loader)
+
+        value = await shield(task)
+        return _loads(value) if value is not None else None
+
+    def _fetch(
+        self,
+        key: str,
+        ttl: float,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[dict | None]],
+    ) -> Task:
+        # Single-flight: concurrent misses for the same key share one request. Called with the lock held.
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is get_running_loop():
+            return task
+
+        generation = self._generation
+
+        async def load() -> bytes | None:
+            try:
+                value = await loader()
+                if value is None:
+                    return None
+
+                # Concurrent waiters share this task, so they get bytes to decode rather than one shared dict
+                encoded = _dumps(value)
+                # Skip error responses and results fetched before an invalidation
+                with self._lock:
+                    if value.get("status_code", 200) < 400 and generation == self._generation:
+                        self._set(key, encoded, ttl, tags)
+                return encoded
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+
+        task = get_running_loop().create_task(load())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return task
+
+    def _set(self, key: str, value: bytes, ttl: float, tags: Iterable[str]) -> None:
+        # _set and _remove are called with the lock held
+        self._remove(key)
+        if len(self._entries) >= self.maxsize:
+            now = monotonic()
+            for old_key in [k for k, (expiry, old_ttl, _, _) in self._entries.items() if now >= expiry + old_ttl]:
+                self._remove(old_key)
+            if len(self._entries) >= self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+        tags = tuple(tags)
+        self._entries[key] = (monotonic() + ttl, ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def invalidate_path(self, path: str) -> None:
+        # Drops the collection tags of the written resource and every tag under its /collection/{id} path
+        segments = path.strip("/").split("/")
+        with self._lock:
+            self.invalidate(*_COLLECTION_TAGS.get(segments[0], (segments[0],)))
+            if len(segments) > 1:
+                prefix = f"/{segments[0]}/{segments[1]}"
+                self.invalidate(*[tag for tag in self._tags if tag == prefix or tag.startswith(f"{prefix}/")])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def _render(template: Any, previous: dict) -> Any:
+    # Only exact {field} tokens are replaced, any other braces are left as they are
+    if isinstance(template, str):
+        match = _PLACEHOLDER.fullmatch(template)
+        if match is not None:
+            return previous[match[1]]
+        return _PLACEHOLDER.sub(lambda token: str(previous[token[1]]), template)
+    if isinstance(template, dict):
+        return {key: _render(value, previous) for key, value in template.items()}
+    if isinstance(template, list):
+        return [_render(value, previous) for value in template]
+    return template
+
+
+@dataclass(frozen=True, slots=True)
+class BatchCall:
+    # `url` and the `data` keys listed in `template_fields` may reference fields of the result at index
+    # `input_from`, e.g. "/ticket/{id}/replies" or {"ticket_id": "{id}"}; a value that is a single placeholder
+    # keeps the field's type. Other data values are sent untouched, so free text may contain braces.
+    method: int | str
+    url: str
+    data: dict | None = None
+    files: dict | None = None
+    handler: str | None = None
+    input_from: int | None = None
+    idempotency_key: str | None = None
+    template_fields: tuple[str, ...] = ()
+
+
+class RequestMethod(Enum):
+    GET = 1
+    POST = 2
+    DELETE = 3
+    PATCH = 4
+    PUT = 5
+
+
+# Direct verb lookup for Ticket.request, keyed by both RequestMethod values and verb names
+_VERBS: dict[int | str, str] = {member.value: member.name for member in RequestMethod} | {
+    member.name: member.name for member in RequestMethod
+}
 
 
 class Ticket:
-    class RequestMethod(Enum):
-        GET = 1
-        POST = 2
-        DELETE = 3
-        PATCH = 4
-        PUT = 5
+    __slots__ = (
+        "BASE_URL",
+        "HEADER",
+        "_cache",
+        "_clients",
+        "_clients_lock",
+        "_etags",
+        "_etags_lock",
+        "cache_ttl",
+        "filters",
+        "max_retries",
+        "timeout",
+        "user_id",
+    )
+
+    RequestMethod = RequestMethod
 
     def __init__(
         self,
@@ -24,13 +348,21 @@ class Ticket:
         user_id: int | None = None,
         filters: str | None = None,
         timeout: int = 15,
+        max_retries: int = 2,
+        cache_ttl: dict[str, float] | None = None,
     ) -> None:
-        self.BASE_URL = base_url or config("SUPPORT_BASE_URL")
-        self.HEADER = {
-            "Authorization": secret_token or f"Bearer {config('SUPPORT_SECRET_TOKEN')}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
+        self.BASE_URL = base_url or _DEFAULT_BASE_URL
+        if not self.BASE_URL:
+            msg = "SUPPORT_BASE_URL not found. Declare it as envvar or pass base_url."
+            raise UndefinedValueError(msg)
+
+        authorization = secret_token or _DEFAULT_AUTH_HEADER
+        if not authorization:
+            msg = "SUPPORT_SECRET_TOKEN not found. Declare it as envvar or pass secret_token."
+            raise UndefinedValueError(msg)
+
+        # Content-Type is set by httpx per request (JSON or multipart), so it is not a client default
+        self.HEADER = Headers({"Authorization": authorization, "Accept": "application/json"})
         self.user_id = user_id
 
         if filters and not isinstance(filters, str):
@@ -39,307 +371,606 @@ class Ticket:
 
         self.filters = f"{filters}" if filters else ""
         self.timeout = timeout
+        self.max_retries = max_retries
+        # One client per event loop, as pooled connections are bound to the loop that opened them
+        self._clients: WeakKeyDictionary[AbstractEventLoop, AsyncClient] = WeakKeyDictionary()
+        self._clients_lock = Lock()
+        # A TTL of 0 disables caching for that endpoint group
+        self.cache_ttl = {**DEFAULT_CACHE_TTL, **(cache_ttl or {})}
+        self._cache = _TTLCache()
+        self._etags: dict[str, tuple[str | None, str | None, bytes]] = {}
+        self._etags_lock = Lock()
+
+    @staticmethod
+    def install_uvloop() -> None:
+        # For callers driving the *_async methods with their own asyncio.run. Event loop policies are
+        # deprecated from Python 3.14, where uvloop.run(...) should be used instead.
+        if uvloop is None:
+            msg = "uvloop is not installed. Install it with `pip install uvloop`."
+            raise ImportError(msg)
+        if sys.version_info >= (3, 14):
+            msg = "Event loop policies are deprecated, run the coroutine with uvloop.run(...) instead."
+            raise RuntimeError(msg)
+        # Looked up lazily so importing this module keeps working once the deprecated function is removed
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    # Shared Client
+    @property
+    def client(self) -> AsyncClient:
+        loop = get_running_loop()
+        client = self._clients.get(loop)
+        if client is not None and not client.is_closed:
+            return client
+
+        with self._clients_lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                # Clients of loops that were closed (e.g. by asyncio.run) can no longer be used
+                for closed_loop in [other for other in self._clients if other.is_closed()]:
+                    del self._clients[closed_loop]
+                client = AsyncClient(
+                    base_url=self.BASE_URL,
+                    headers=self.HEADER,
+                    timeout=self.timeout,
+                    limits=Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0),
+                    http2=_HTTP2,
+                )
+                self._clients[loop] = client
+        return client
+
+    async def _aclose_loop_client(self, loop: AbstractEventLoop) -> None:
+        with self._clients_lock:
+            client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self) -> None:
+        running = get_running_loop()
+        with self._clients_lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+
+        for loop, client in clients:
+            if loop is running:
+                await client.aclose()
+            elif loop.is_running():
+                # Closed on its own loop without waiting, that loop's thread may be blocked on this call
+                run_coroutine_threadsafe(client.aclose(), loop)
+
+    def close(self) -> None:
+        self._run_sync(self.aclose())
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _run_sync(self, coro: Coroutine[Any, Any, T]) -> T:
+        loop = _background_loop()
+        try:
+            running = get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is not loop:
+            return run_coroutine_threadsafe(coro, loop).result()
+
+        # Called from a coroutine already on the background loop: blocking on it would deadlock,
+        # so run on a fresh loop in a worker thread and close only the client bound to that loop.
+        async def runner() -> T:
+            try:
+                return await coro
+            finally:
+                await self._aclose_loop_client(get_running_loop())
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio_run, runner()).result()
+
+    @staticmethod
+    def _multipart(data: dict | None, files: dict) -> tuple[dict, dict]:
+        # Prepare files for multipart upload and convert data values to strings
+        file_dict = {}
+        for key, file_obj in files.items():
+            # Use the original filename and content from the InMemoryUploadedFile
+            file_dict[key] = (file_obj.name, file_obj.file, file_obj.content_type)
+
+        # Convert data dict values to strings for multipart encoding
+        form_data = {}
+        if data:
+            for k, v in data.items():
+                if isinstance(v, (bool, int, float, str)):
+                    form_data[k] = str(v)
+                elif v is None:
+                    form_data[k] = ""
+                else:
+                    # Skip complex objects that can't be sent as form fields
+                    continue
+
+        return form_data, file_dict
 
     # Make the Request Methods
-    async def get(self, url: str, data: dict | None = None) -> dict:
-        async with AsyncClient() as client:
-            response = await client.get(url=url, headers=self.HEADER, params=data, timeout=self.timeout)
-            return {**response.json(), "status_code": response.status_code}
-
-    async def get_binary(self, url: str, data: dict | None = None) -> dict:
-        async with AsyncClient() as client:
-            response = await client.get(url=url, headers=self.HEADER, params=data, timeout=self.timeout)
-            # Return the raw content instead of parsing as JSON
-            return {
-                "content": response.content,
-                "status_code": response.status_code,
-                "content_type": response.headers.get("content-type"),
-            }
-
-    async def post(self, url: str, data: dict | None = None, files: dict | None = None) -> dict:
-        # When sending files, we need to use multipart/form-data
-        headers = self.HEADER.copy()
-
-        if files:
-            # Remove Content-Type header for multipart/form-data requests
-            headers.pop("Content-Type", None)
+    @staticmethod
+    def _handle(response: Response) -> dict:
+        # Single decode path for every JSON response; errors are reported through status_code, not raised
+        return {**_loads(response.content), "status_code": response.status_code}
+
+    async def _send_with_retry(self, verb: str, url: str, **kwargs: Any) -> Response:
+        headers = kwargs.get("headers") or {}
+        retriable = verb in _IDEMPOTENT_VERBS or "Idempotency-Key" in headers
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(verb, url, **kwargs)
+            except TransportError:
+                if not retriable or attempt >= self.max_retries:
+                    raise
+                delay = random() * min(_RETRY_CAP, _RETRY_BASE * 2**attempt)
+            else:
+                if not retriable or attempt >= self.max_retries or response.status_code not in _RETRY_STATUSES:
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = random() * min(_RETRY_CAP, _RETRY_BASE * 2**attempt)
+                elif delay > _RETRY_CAP:
+                    # The server asked for a longer pause than we are willing to block for
+                    return response
+
+            attempt += 1
+            await sleep(delay)
+
+    async def send(
+        self,
+        verb: str,
+        url: str,
+        data: dict | None = None,
+        files: dict | None = None,
+        *,
+        idempotency_key: str | None = None,
+    ) -> dict:
+        if verb == "GET":
+            return await self._conditional_get(url, data)
 
-        async with AsyncClient() as client:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        try:
             if files:
-                # Prepare files for multipart upload and convert data values to strings
-                file_dict = {}
-                for key, file_obj in files.items():
-                    # Use the original filename and content from the InMemoryUploadedFile
-                    file_dict[key] = (file_obj.name, file_obj.file, file_obj.content_type)
-
-                # Convert data dict values to strings for multipart encoding
-                form_data = {}
-                if data:
-                    for k, v in data.items():
-                        if isinstance(v, (bool, int, float, str)):
-                            form_data[k] = str(v)
-                        elif v is None:
-                            form_data[k] = ""
-                        else:
-                            # Skip complex objects that can't be sent as form fields
-                            continue
-
-                response = await client.post(
-                    url=url,
-                    headers=headers,
-                    data=form_data,
-                    files=file_dict,
-                    timeout=self.timeout,
-                )
+                # When sending files, httpx builds the multipart/form-data body and its Content-Type
+                form_data, file_dict = self._multipart(data, files)
+                response = await self._send_with_retry(verb, url, data=form_data, files=file_dict, headers=headers)
+            elif data is not None and verb != "DELETE":
+                headers.update(_JSON_HEADERS)
+                response = await self._send_with_retry(verb, url, content=_dumps(data), headers=headers)
             else:
-                response = await client.post(url=url, headers=headers, json=data, timeout=self.timeout)
+                response = await self._send_with_retry(verb, url, headers=headers)
+        finally:
+            # Every write drops the cached reads of the resource it touches, whichever method sent it
+            self._cache.invalidate_path(self._relative_path(url))
+
+        return self._handle(response)
+
+    def _relative_path(self, url: str) -> str:
+        target = URL(url)
+        if not target.is_absolute_url:
+            return target.path
+
+        base_path = self.client.base_url.path.rstrip("/")
+        return target.path.removeprefix(base_path) if target.path.startswith(f"{base_path}/") else target.path
+
+    async def _conditional_get(self, url: str, data: dict | None = None) -> dict:
+        # Revalidate with the last ETag/Last-Modified of this URL, a 304 reuses the stored body
+        key = _cache_key(url, data)
+        validator = self._etags.get(key)
+        headers = None
+        if validator is not None:
+            etag, last_modified, _ = validator
+            headers = {"If-None-Match": etag} if etag else {"If-Modified-Since": last_modified}
+
+        response = await self._send_with_retry("GET", url, params=data, headers=headers)
+        if response.status_code == 304 and validator is not None:
+            return _loads(validator[2])
+
+        body = self._handle(response)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.is_success and (etag or last_modified):
+            with self._etags_lock:
+                self._etags.pop(key, None)
+                if len(self._etags) >= _ETAG_MAXSIZE:
+                    del self._etags[next(iter(self._etags))]
+                # Kept encoded, so every 304 decodes its own copy of the body
+                self._etags[key] = (etag, last_modified, _dumps(body))
+        return body
 
-            return {**response.json(), "status_code": response.status_code}
-
-    async def put(self, url: str, data: dict | None = None, files: dict | None = None) -> dict:
-        headers = self.HEADER.copy()
+    async def get(self, url: str, data: dict | None = None) -> dict:
+        return await self.send("GET", url, data)
 
-        if files:
-            # Remove Content-Type header for multipart/form-data requests
-            headers.pop("Content-Type", None)
+    async def get_binary(self, url: str, data: dict | None = None) -> dict:
+        response = await self._send_with_retry("GET", url, params=data)
+        # Return the raw content instead of parsing as JSON
+        return {
+            "content": response.content,
+            "status_code": response.status_code,
+            "content_type": response.headers.get("content-type"),
+        }
 
-        async with AsyncClient() as client:
-            if files:
-                # Prepare files for multipart upload and convert data values to strings
-                file_dict = {}
-                for key, file_obj in files.items():
-                    # Use the original filename and content from the InMemoryUploadedFile
-                    file_dict[key] = (file_obj.name, file_obj.file, file_obj.content_type)
-
-                # Convert data dict values to strings for multipart encoding
-                form_data = {}
-                if data:
-                    for k, v in data.items():
-                        if isinstance(v, (bool, int, float, str)):
-                            form_data[k] = str(v)
-                        elif v is None:
-                            form_data[k] = ""
-                        else:
-                            # Skip complex objects that can't be sent as form fields
-                            continue
-
-                response = await client.put(
-                    url=url,
-                    headers=headers,
-                    data=form_data,
-                    files=file_dict,
-                    timeout=self.timeout,
-                )
-            else:
-                response = await client.put(url=url, headers=headers, json=data, timeout=self.timeout)
+    async def post(self, url: str, data: dict | None = None, files: dict | None = None) -> dict:
+        return await self.send("POST", url, data, files)
 
-            return {**response.json(), "status_code": response.status_code}
+    async def put(self, url: str, data: dict | None = None, files: dict | None = None) -> dict:
+        return await self.send("PUT", url, data, files)
 
     async def delete(self, url: str) -> dict:
-        async with AsyncClient() as client:
-            response = await client.delete(url=url, headers=self.HEADER, timeout=self.timeout)
-            return {**response.json(), "status_code": response.status_code}
+        return await self.send("DELETE", url)
 
     async def request(
         self,
         url: str,
-        method: int,
+        method: int | str,
         data: dict | None = None,
         files: dict | None = None,
         handler: str | None = None,
+        *,
+        ttl: float = 0,
+        tags: tuple[str, ...] = (),
+        invalidates: tuple[str, ...] = (),
+        idempotency_key: str | None = None,
     ) -> dict | None:
-        url = url + self.filters
-
-        match method:
-            case Ticket.RequestMethod.GET.value:
-                if handler == "binary":
-                    return await self.get_binary(url, data)
-                return await self.get(url, data)
-
-            case Ticket.RequestMethod.POST.value:
-                return await self.post(url, data, files)
+        # Accepts an HTTP verb (in any case) or a RequestMethod value
+        verb = _VERBS.get(method.upper() if isinstance(method, str) else method)
+        if verb is None:
+            msg = f"Unsupported request method: {method!r}."
+            raise ValueError(msg)
 
-            case Ticket.RequestMethod.PUT.value:
-                return await self.put(url, data, files)
+        url = url + self.filters
 
-            case Ticket.RequestMethod.DELETE.value:
-                return await self.delete(url)
+        if verb == "GET":
+            if handler == "binary":
+                return await self.get_binary(url, data)
+            if ttl > 0:
+                key = _cache_key(url, data)
+                return await self._cache.get_or_fetch(key, ttl, tags, lambda: self.send(verb, url, data))
+            return await self.send(verb, url, data)
+
+        response = await self.send(verb, url, data, files, idempotency_key=idempotency_key)
+        if invalidates:
+            self._cache.invalidate(*invalidates)
+        return response
+
+    def cache_clear(self) -> None:
+        self._cache.clear()
+        with self._etags_lock:
+            self._etags.clear()
+
+    async def request_many(
+        self,
+        calls: Iterable[BatchCall],
+        *,
+        concurrency: int | None = None,
+    ) -> list[dict | BaseException | None]:
+        calls = list(calls)
+
+        # Group the calls into layers by dependency depth, each layer runs concurrently
+        layers: list[list[int]] = []
+        depth: list[int] = []
+        for index, call in enumerate(calls):
+            if call.input_from is None:
+                level = 0
+            elif 0 <= call.input_from < index:
+                level = depth[call.input_from] + 1
+            else:
+                msg = f"The input_from of call {index} must point to an earlier call."
+                raise ValueError(msg)
+
+            depth.append(level)
+            if level == len(layers):
+                layers.append([])
+            layers[level].append(index)
+
+        semaphore = Semaphore(concurrency) if concurrency else None
+        results: list[dict | BaseException | None] = [None] * len(calls)
+
+        async def run(index: int, call: BatchCall) -> dict | None:
+            url, data = call.url, call.data
+            if call.input_from is not None:
+                previous = results[call.input_from]
+                if isinstance(previous, BaseException):
+                    raise previous
+
+                previous = previous or {}
+                status_code = previous.get("status_code", 200)
+                if status_code >= 400:
+                    msg = f"Call {index} depends on call {call.input_from}, which failed with status {status_code}."
+                    raise ValueError(msg)
+
+                try:
+                    url = _render(url, previous)
+                    if data and call.template_fields:
+                        data = {
+                            key: _render(value, previous) if key in call.template_fields else value
+                            for key, value in data.items()
+                        }
+                except KeyError as error:
+                    msg = f"Call {index} references field {error} missing from the result of call {call.input_from}."
+                    raise ValueError(msg) from error
+
+            request = self.request(
+                url, call.method, data, call.files, call.handler, idempotency_key=call.idempotency_key
+            )
+            if semaphore is None:
+                return await request
+            async with semaphore:
+                return await request
+
+        for layer in layers:
+            responses = await gather(*(run(index, calls[index]) for index in layer), return_exceptions=True)
+            for index, response in zip(layer, responses):
+                results[index] = response
+
+        return results
+
+    def request_many_sync(
+        self,
+        calls: Iterable[BatchCall],
+        *,
+        concurrency: int | None = None,
+    ) -> list[dict | BaseException | None]:
+        return self._run_sync(self.request_many(calls, concurrency=concurrency))
 
     # Log
     async def log_list_async(self, log_id: int | str) -> dict | None:
-        log_id = str(log_id) if isinstance(log_id, int) else log_id
-
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/getLog/{log_id}",
+            method="GET",
+            url=f"/getLog/{log_id}",
+            ttl=self.cache_ttl["log_list"],
+            tags=("log",),
         )
 
     def log_list_sync(self, log_id: int | str) -> dict | None:
-        return asyncio_run(self.log_list_async(log_id=log_id))
+        return self._run_sync(self.log_list_async(log_id=log_id))
 
     # Department
     async def department_list_async(self) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/department",
+            method="GET",
+            url="/department",
+            ttl=self.cache_ttl["department_list"],
+            tags=("department",),
         )
 
     def department_list_sync(self) -> dict | None:
-        return asyncio_run(self.department_list_async())
+        return self._run_sync(self.department_list_async())
 
-    async def department_create_async(self, *, data: dict) -> dict | None:
+    async def department_create_async(self, *, data: dict, idempotency_key: str | None = None) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.POST.value,
-            url=f"{self.BASE_URL}/department",
+            method="POST",
+            url="/department",
             data=data,
+            idempotency_key=idempotency_key,
         )
 
-    def department_create_sync(self, *, data: dict) -> dict | None:
-        return asyncio_run(self.department_create_async(data=data))
+    def department_create_sync(self, *, data: dict, idempotency_key: str | None = None) -> dict | None:
+        return self._run_sync(self.department_create_async(data=data, idempotency_key=idempotency_key))
 
     async def department_get_async(self, *, department_id: int) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/department/{department_id}",
+            method="GET",
+            url=_department_path(department_id),
+            ttl=self.cache_ttl["entity"],
+            tags=(_department_path(department_id),),
         )
 
     def department_get_sync(self, *, department_id: int) -> dict | None:
-        return asyncio_run(self.department_get_async(department_id=department_id))
+        return self._run_sync(self.department_get_async(department_id=department_id))
 
     async def department_update_async(self, *, department_id: int, data: dict) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.PUT.value,
-            url=f"{self.BASE_URL}/department/{department_id}",
+            method="PUT",
+            url=_department_path(department_id),
             data=data,
         )
 
     def department_update_sync(self, *, department_id: int, data: dict) -> dict | None:
-        return asyncio_run(self.department_update_async(department_id=department_id, data=data))
+        return self._run_sync(self.department_update_async(department_id=department_id, data=data))
 
     async def department_delete_async(self, *, department_id: int) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.DELETE.value,
-            url=f"{self.BASE_URL}/department/{department_id}",
+            method="DELETE",
+            url=_department_path(department_id),
         )
 
     def department_delete_sync(self, *, department_id: int) -> dict | None:
-        return asyncio_run(self.department_delete_async(department_id=department_id))
+        return self._run_sync(self.department_delete_async(department_id=department_id))
 
     # Ticket
-    async def ticket_create_async(self, *, data: dict, files: dict | None = None) -> dict | None:
+    async def ticket_create_async(
+        self,
+        *,
+        data: dict,
+        files: dict | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.POST.value,
-            url=f"{self.BASE_URL}/ticket",
+            method="POST",
+            url="/ticket",
             data=data,
             files=files,
+            idempotency_key=idempotency_key,
         )
 
-    def ticket_create_sync(self, *, data: dict, files: dict | None = None) -> dict | None:
-        return asyncio_run(self.ticket_create_async(data=data, files=files))
+    def ticket_create_sync(
+        self,
+        *,
+        data: dict,
+        files: dict | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict | None:
+        return self._run_sync(self.ticket_create_async(data=data, files=files, idempotency_key=idempotency_key))
 
     async def ticket_get_async(self, ticket_id: int | str) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/ticket/{ticket_id}",
+            method="GET",
+            url=_ticket_path(ticket_id),
+            ttl=self.cache_ttl["entity"],
+            tags=(_ticket_path(ticket_id),),
         )
 
     def ticket_get_sync(self, ticket_id: int | str) -> dict | None:
-        return asyncio_run(self.ticket_get_async(ticket_id=ticket_id))
+        return self._run_sync(self.ticket_get_async(ticket_id=ticket_id))
+
+    async def ticket_get_many_async(self, ticket_ids: Iterable[int | str]) -> list[dict | BaseException | None]:
+        return await gather(*(self.ticket_get_async(ticket_id) for ticket_id in ticket_ids), return_exceptions=True)
+
+    def ticket_get_many_sync(self, ticket_ids: Iterable[int | str]) -> list[dict | BaseException | None]:
+        return self._run_sync(self.ticket_get_many_async(ticket_ids))
 
     async def ticket_list_async(self) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/ticket",
+            method="GET",
+            url="/ticket",
+            ttl=self.cache_ttl["ticket_list"],
+            tags=("ticket",),
         )
 
     def ticket_list_sync(self) -> dict | None:
-        return asyncio_run(self.ticket_list_async())
+        return self._run_sync(self.ticket_list_async())
 
     async def all_ticket_list_async(self) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/ticket",
+            method="GET",
+            url="/ticket",
+            ttl=self.cache_ttl["ticket_list"],
+            tags=("ticket",),
         )
 
     def all_ticket_list_sync(self) -> dict | None:
-        return asyncio_run(self.all_ticket_list_async())
+        return self._run_sync(self.all_ticket_list_async())
 
     async def ticket_replies_async(self, ticket_id: int | str) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/ticket/{ticket_id}/replies",
+            method="GET",
+            url=_ticket_replies_path(ticket_id),
+            ttl=self.cache_ttl["entity"],
+            tags=("replies", _ticket_replies_path(ticket_id)),
         )
 
     def ticket_replies_sync(self, ticket_id: int | str) -> dict | None:
-        return asyncio_run(self.ticket_replies_async(ticket_id=ticket_id))
+        return self._run_sync(self.ticket_replies_async(ticket_id=ticket_id))
 
     async def ticket_update_async(self, *, ticket_id: int | str, data: dict, files: dict | None = None) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.PUT.value,
-            url=f"{self.BASE_URL}/ticket/{ticket_id}",
+            method="PUT",
+            url=_ticket_path(ticket_id),
             data=data,
             files=files,
         )
 
     def ticket_update_sync(self, *, ticket_id: int | str, data: dict, files: dict | None = None) -> dict | None:
-        return asyncio_run(self.ticket_update_async(ticket_id=ticket_id, data=data, files=files))
+        return self._run_sync(self.ticket_update_async(ticket_id=ticket_id, data=data, files=files))
 
     async def ticket_delete_async(self, *, ticket_id: int | str) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.DELETE.value,
-            url=f"{self.BASE_URL}/ticket/{ticket_id}",
+            method="DELETE",
+            url=_ticket_path(ticket_id),
         )
 
     def ticket_delete_sync(self, *, ticket_id: int | str) -> dict | None:
-        return asyncio_run(self.ticket_delete_async(ticket_id=ticket_id))
+        return self._run_sync(self.ticket_delete_async(ticket_id=ticket_id))
 
     async def ticket_attach_async(self, file_id: int | str) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/file/{file_id}",
+            method="GET",
+            url=f"/file/{file_id}",
             handler="binary",
         )
 
     def ticket_attach_sync(self, file_id: int | str) -> dict | None:
-        return asyncio_run(self.ticket_attach_async(file_id=file_id))
+        return self._run_sync(self.ticket_attach_async(file_id=file_id))
 
     # Replies
-    async def replies_create_async(self, *, data: dict, files: dict | None = None) -> dict | None:
+    async def replies_create_async(
+        self,
+        *,
+        data: dict,
+        files: dict | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.POST.value,
-            url=f"{self.BASE_URL}/ticket-replies",
+            method="POST",
+            url="/ticket-replies",
             data=data,
             files=files,
+            idempotency_key=idempotency_key,
         )
 
-    def replies_create_sync(self, *, data: dict, files: dict | None = None) -> dict | None:
-        return asyncio_run(self.replies_create_async(data=data, files=files))
+    def replies_create_sync(
+        self,
+        *,
+        data: dict,
+        files: dict | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict | None:
+        return self._run_sync(self.replies_create_async(data=data, files=files, idempotency_key=idempotency_key))
+
+    async def replies_create_many_async(
+        self,
+        *,
+        data: Iterable[dict],
+        idempotency_keys: Iterable[str | None] | None = None,
+    ) -> list[dict | BaseException | None]:
+        # One idempotency key per reply, in the same order as `data`
+        data = list(data)
+        keys = list(idempotency_keys) if idempotency_keys is not None else [None] * len(data)
+        if len(keys) != len(data):
+            msg = "The idempotency_keys must have one key per item of data."
+            raise ValueError(msg)
+
+        return await gather(
+            *(self.replies_create_async(data=item, idempotency_key=key) for item, key in zip(data, keys)),
+            return_exceptions=True,
+        )
+
+    def replies_create_many_sync(
+        self,
+        *,
+        data: Iterable[dict],
+        idempotency_keys: Iterable[str | None] | None = None,
+    ) -> list[dict | BaseException | None]:
+        return self._run_sync(self.replies_create_many_async(data=data, idempotency_keys=idempotency_keys))
 
     async def replies_update_async(self, *, reply_id: int, data: dict, files: dict | None = None) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.PUT.value,
-            url=f"{self.BASE_URL}/ticket-replies/{reply_id}",
+            method="PUT",
+            url=_reply_path(reply_id),
             data=data,
             files=files,
         )
 
     def replies_update_sync(self, *, reply_id: int, data: dict, files: dict | None = None) -> dict | None:
-        return asyncio_run(self.replies_update_async(reply_id=reply_id, data=data, files=files))
+        return self._run_sync(self.replies_update_async(reply_id=reply_id, data=data, files=files))
 
     async def replies_delete_async(self, *, reply_id: int) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.DELETE.value,
-            url=f"{self.BASE_URL}/ticket-replies/{reply_id}",
+            method="DELETE",
+            url=_reply_path(reply_id),
         )
 
     def replies_delete_sync(self, *, reply_id: int) -> dict | None:
-        return asyncio_run(self.replies_delete_async(reply_id=reply_id))
+        return self._run_sync(self.replies_delete_async(reply_id=reply_id))
 
     async def replies_get_async(self, *, reply_id: int) -> dict | None:
         return await self.request(
-            method=Ticket.RequestMethod.GET.value,
-            url=f"{self.BASE_URL}/ticket-replies/{reply_id}",
+            method="GET",
+            url=_reply_path(reply_id),
+            ttl=self.cache_ttl["entity"],
+            tags=(_reply_path(reply_id),),
         )
 
     def replies_get_sync(self, *, reply_id: int) -> dict | None:
-        return asyncio_run(self.replies_get_async(reply_id=reply_id))
+        return self._run_sync(self.replies_get_async(reply_id=reply_id))
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import sys
+
+import httpx
+import pytest
+
+from pysup import support
+from pysup.support import BatchCall, Ticket
+
+
+class FakeServer:
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.responses:
+            return self.responses.pop(0)
+        return httpx.Response(200, json={"id": 7, "path": request.url.path})
+
+    @property
+    def paths(self) -> list[str]:
+        return [request.url.path for request in self.requests]
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> FakeServer:
+    server = FakeServer()
+
+    class MockClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs) -> None:
+            kwargs.pop("http2", None)
+            super().__init__(*args, transport=httpx.MockTransport(server), **kwargs)
+
+    monkeypatch.setattr(support, "AsyncClient", MockClient)
+    return server
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(support, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def delays(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(support, "sleep", sleep)
+    return delays
+
+
+def make_ticket(**kwargs) -> Ticket:
+    return Ticket(base_url="https://support.test", secret_token="Bearer token", **kwargs)
+
+
+def test_cache_hit_expiry_and_invalidation(server: FakeServer, clock: list[float]) -> None:
+    async def main() -> None:
+        async with make_ticket(cache_ttl={"department_list": 10}) as ticket:
+            first = await ticket.department_list_async()
+            first["mutated"] = True
+            assert "mutated" not in await ticket.department_list_async()
+            assert server.paths == ["/department"]
+
+            await ticket.department_update_async(department_id=1, data={"name": "x"})
+            await ticket.department_list_async()
+            assert server.paths == ["/department", "/department/1", "/department"]
+
+            # Stale entries are served while a background refresh runs
+            clock[0] += 15
+            await ticket.department_list_async()
+            assert len(server.requests) == 3
+            await asyncio.sleep(0.01)
+            assert len(server.requests) == 4
+
+            # Past the stale window the entry is fetched again
+            clock[0] += 30
+            await ticket.department_list_async()
+            assert len(server.requests) == 5
+
+    asyncio.run(main())
+
+
+def test_cache_hits_do_not_share_nested_values(server: FakeServer) -> None:
+    server.responses = [httpx.Response(200, json={"items": [{"id": 1}]})]
+
+    async def main() -> None:
+        async with make_ticket() as ticket:
+            first, second = await asyncio.gather(ticket.department_list_async(), ticket.department_list_async())
+            first["items"].append({"id": 2})
+            second["items"][0]["id"] = 3
+            assert (await ticket.department_list_async())["items"] == [{"id": 1}]
+
+    asyncio.run(main())
+    assert len(server.requests) == 1
+
+
+def test_cache_shares_concurrent_misses(server: FakeServer) -> None:
+    async def main() -> None:
+        async with make_ticket() as ticket:
+            await asyncio.gather(*(ticket.ticket_list_async() for _ in range(5)))
+
+    asyncio.run(main())
+    assert server.paths == ["/ticket"]
+
+
+def test_cache_tags_are_pruned_on_eviction(server: FakeServer) -> None:
+    async def main() -> Ticket:
+        async with make_ticket() as ticket:
+            ticket._cache.maxsize = 8
+            for reply_id in range(50):
+                await ticket.replies_get_async(reply_id=reply_id)
+            return ticket
+
+    ticket = asyncio.run(main())
+    assert len(ticket._cache._entries) == 8
+    assert len(ticket._cache._tags) == 8
+
+
+def test_cache_is_shared_across_threads(server: FakeServer) -> None:
+    ticket = make_ticket()
+    ticket._cache.maxsize = 16
+
+    def read(offset: int) -> None:
+        for reply_id in range(offset, offset + 200):
+            ticket.replies_get_sync(reply_id=reply_id % 40)
+
+    async def main() -> None:
+        for offset in range(0, 40, 10):
+            await ticket.replies_get_async(reply_id=offset)
+        await asyncio.gather(*(asyncio.to_thread(read, offset) for offset in range(4)))
+        for reply_id in range(40):
+            await ticket.replies_get_async(reply_id=reply_id)
+            await ticket.delete(f"/ticket-replies/{reply_id}")
+
+    asyncio.run(main())
+    ticket.close()
+    assert len(ticket._cache._entries) <= 16
+
+
+def test_every_write_invalidates_cached_reads(server: FakeServer) -> None:
+    async def main() -> None:
+        async with make_ticket() as ticket:
+            await ticket.department_list_async()
+            await ticket.department_get_async(department_id=1)
+            await ticket.ticket_replies_async(5)
+            assert len(server.requests) == 3
+
+            await ticket.put("/department/1", {"name": "x"})
+            await ticket.department_list_async()
+            await ticket.department_get_async(department_id=1)
+            assert server.paths[-2:] == ["/department", "/department/1"]
+
+            await ticket.request_many([BatchCall("PUT", "/department/1", {"name": "y"})])
+            await ticket.department_list_async()
+            assert server.paths[-1] == "/department"
+
+            await ticket.delete("/ticket/5")
+            await ticket.ticket_replies_async(5)
+            assert server.paths[-1] == "/ticket/5/replies"
+
+    asyncio.run(main())
+
+
+def test_not_modified_reuses_stored_body(server: FakeServer) -> None:
+    server.responses = [
+        httpx.Response(200, json={"items": [1]}, headers={"etag": '"v1"'}),
+        httpx.Response(304),
+        httpx.Response(304),
+    ]
+
+    async def main() -> list[dict]:
+        async with make_ticket(cache_ttl={"department_list": 0}) as ticket:
+            first = await ticket.department_list_async()
+            first["items"].append(2)
+            return [await ticket.department_list_async(), await ticket.department_list_async()]
+
+    second, third = asyncio.run(main())
+    second["items"].append(3)
+    assert third == {"items": [1], "status_code": 200}
+    assert [request.headers.get("if-none-match") for request in server.requests] == [None, '"v1"', '"v1"']
+
+
+def test_request_accepts_verbs_and_rejects_unknown_methods(server: FakeServer) -> None:
+    async def main() -> None:
+        async with make_ticket() as ticket:
+            assert (await ticket.request("/ticket", "get"))["status_code"] == 200
+            assert (await ticket.request("/ticket/1", Ticket.RequestMethod.PATCH.value, {"a": 1}))["status_code"] == 200
+            with pytest.raises(ValueError, match="'FETCH'"):
+                await ticket.request("/ticket", "FETCH")
+            with pytest.raises(ValueError):
+                await ticket.request("/ticket", 42)
+
+    asyncio.run(main())
+    assert [request.method for request in server.requests] == ["GET", "PATCH"]
+
+
+def test_request_many_forwards_results_by_layer(server: FakeServer) -> None:
+    calls = [
+        BatchCall("POST", "/ticket", {"title": "a"}),
+        BatchCall(
+            "POST",
+            "/ticket-replies",
+            {"ticket_id": "{id}", "body": "on {path}"},
+            input_from=0,
+            template_fields=("ticket_id", "body"),
+        ),
+        BatchCall("GET", "/ticket/{id}/replies", input_from=1),
+    ]
+
+    results = make_ticket().request_many_sync(calls)
+    assert all(result["status_code"] == 200 for result in results)
+    assert server.paths == ["/ticket", "/ticket-replies", "/ticket/7/replies"]
+    assert server.requests[1].content == b'{"ticket_id":7,"body":"on /ticket"}'
+
+
+def test_request_many_reports_failed_dependency(server: FakeServer) -> None:
+    server.responses = [httpx.Response(404, json={"detail": "not found"})]
+
+    results = make_ticket().request_many_sync(
+        [BatchCall("GET", "/ticket/1"), BatchCall("GET", "/ticket/{id}/replies", input_from=0)],
+    )
+    assert results[0]["status_code"] == 404
+    assert isinstance(results[1], ValueError)
+    assert "call 0" in str(results[1])
+
+
+def test_request_many_leaves_free_text_braces(server: FakeServer) -> None:
+    calls = [
+        BatchCall("POST", "/ticket", {"title": "a"}),
+        BatchCall(
+            "POST",
+            "/ticket-replies",
+            {"ticket_id": "{id}", "body": 'hi {customer}, see config {"a": 1} and use {} here'},
+            input_from=0,
+            template_fields=("ticket_id",),
+        ),
+        BatchCall("GET", "/ticket/{id}", {"q": "{name}"}, input_from=0, template_fields=("q",)),
+    ]
+
+    results = make_ticket().request_many_sync(calls)
+    assert results[1]["status_code"] == 200
+    assert support._loads(server.requests[1].content) == {
+        "ticket_id": 7,
+        "body": 'hi {customer}, see config {"a": 1} and use {} here',
+    }
+    assert isinstance(results[2], ValueError)
+    assert "'name'" in str(results[2])
+
+
+def test_json_bodies_match_with_and_without_orjson(server: FakeServer, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("orjson")
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("pysup_stdlib_json", support.__file__)
+    stdlib = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, spec.name, stdlib)
+    spec.loader.exec_module(stdlib)
+    assert stdlib.orjson is None
+
+    data = {1: "é", "items": [1.5, None, True]}
+    encoded = '{"1":"é","items":[1.5,null,true]}'.encode()
+    assert support._dumps(data) == stdlib._dumps(data) == encoded
+    assert support._loads(encoded) == stdlib._loads(encoded) == {"1": "é", "items": [1.5, None, True]}
+
+    server.responses = [httpx.Response(200, json={"name": "é"})]
+    response = make_ticket().department_update_sync(department_id=1, data={"name": "é"})
+    assert server.requests[0].content == '{"name":"é"}'.encode()
+    assert server.requests[0].headers["content-type"] == "application/json"
+    assert response == {"name": "é", "status_code": 200}
+
+
+def test_retries_idempotent_requests(server: FakeServer, delays: list[float]) -> None:
+    server.responses = [
+        httpx.Response(503, json={}, headers={"retry-after": "2"}),
+        httpx.Response(503, json={}),
+    ]
+
+    async def main() -> dict:
+        async with make_ticket() as ticket:
+            return await ticket.ticket_update_async(ticket_id=1, data={})
+
+    assert asyncio.run(main())["status_code"] == 200
+    assert len(server.requests) == 3
+    assert delays[0] == 2.0
+
+
+def test_post_is_retried_only_with_idempotency_key(server: FakeServer, delays: list[float]) -> None:
+    async def main() -> tuple[dict, dict]:
+        async with make_ticket() as ticket:
+            server.responses = [httpx.Response(503, json={})]
+            without_key = await ticket.ticket_create_async(data={})
+            server.responses = [httpx.Response(503, json={})]
+            with_key = await ticket.ticket_create_async(data={}, idempotency_key="key-1")
+            return without_key, with_key
+
+    without_key, with_key = asyncio.run(main())
+    assert without_key["status_code"] == 503
+    assert with_key["status_code"] == 200
+    assert [request.headers.get("idempotency-key") for request in server.requests] == [None, "key-1", "key-1"]
+
+
+@pytest.mark.parametrize("status_code", [400, 404, 500])
+def test_error_statuses_are_returned_not_raised(server: FakeServer, status_code: int) -> None:
+    body = {"detail": "failed", "errors": {"title": ["required"]}}
+    assert Ticket._handle(httpx.Response(status_code, json=body)) == {**body, "status_code": status_code}
+
+    server.responses = [httpx.Response(status_code, json=body)]
+    assert make_ticket().ticket_create_sync(data={}) == {**body, "status_code": status_code}
+
+
+def test_ticket_has_no_instance_dict() -> None:
+    ticket = make_ticket()
+    assert not hasattr(ticket, "__dict__")
+    with pytest.raises(AttributeError):
+        ticket.unknown = 1
+
+
+def test_sync_call_inside_running_loop_keeps_clients(server: FakeServer) -> None:
+    ticket = make_ticket()
+
+    async def main() -> None:
+        client = ticket.client
+        responses = await asyncio.gather(ticket.ticket_get_async(1), asyncio.to_thread(ticket.ticket_get_sync, 2))
+        assert ticket.ticket_get_sync(3)["status_code"] == 200
+        assert ticket.client is client
+        assert not client.is_closed
+        assert [response["status_code"] for response in responses] == [200, 200]
+
+    asyncio.run(main())
+    ticket.close()
+    assert sorted(server.paths) == ["/ticket/1", "/ticket/2", "/ticket/3"]
+
+
+def test_sync_call_nested_in_background_loop(server: FakeServer) -> None:
+    ticket = make_ticket()
+
+    async def nested() -> dict:
+        return ticket.ticket_attach_sync(1)
+
+    assert ticket._run_sync(nested())["status_code"] == 200
+    ticket.close()